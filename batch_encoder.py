@@ -0,0 +1,117 @@
+# batch_encoder.py
+"""
+Micro-batching query encoder shared across concurrent Streamlit sessions.
+
+Every session used to call `embed_model.encode` on its own single query, so the
+shared SentenceTransformer ran many tiny forward passes back to back. The
+BatchingEncoder collects queries from all sessions for a few milliseconds (or
+until a batch fills up) and encodes them in one forward pass on a background
+thread. Callers get a Future back, or can call `encode` as a drop-in
+replacement for `SentenceTransformer.encode`. Only plain single-string calls are
+batched; anything else goes straight to the model so no option is silently dropped.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# --- Defaults ---
+MAX_BATCH_SIZE = 32
+MAX_WAIT_MS = 5.0
+
+
+class BatchingEncoder:
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        # Guards _closed so nothing can be queued behind the shutdown sentinel
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+        self._thread.start()
+
+    # --- Public API ---
+    def submit(self, text):
+        """Queue one query for encoding and return a Future resolving to its embedding tensor."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchingEncoder is closed")
+            self._queue.put((text, future))
+        return future
+
+    def encode(self, sentences, convert_to_tensor=False, **kwargs):
+        """Same call shape as SentenceTransformer.encode so it can be passed to search_embeddings."""
+        if isinstance(sentences, str) and not kwargs:
+            embedding = self.submit(sentences).result()
+            return embedding if convert_to_tensor else embedding.cpu().numpy()
+
+        # Lists are already batched, and extra options (normalize_embeddings, device, ...)
+        # would change the vector, so both go straight to the model
+        return self.model.encode(sentences, convert_to_tensor=convert_to_tensor, **kwargs)
+
+    def close(self):
+        """Stop the background thread once queued requests have been served."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    # --- Background Loop ---
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_s
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Serve what we have, then let the main loop see the shutdown signal
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _fail_pending(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("BatchingEncoder is closed"))
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._fail_pending()
+                return
+
+            batch = self._collect_batch(first)
+            # Skip callers that gave up before the forward pass
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                embeddings = self.model.encode([text for text, _ in batch], convert_to_tensor=True)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for i, (_, future) in enumerate(batch):
+                future.set_result(embeddings[i])
@@ -0,0 +1,84 @@
+# bench_encoder.py
+"""
+Compares query-encoding throughput and tail latency with and without micro-batching.
+
+Many session threads encode single queries at once, first straight through the
+shared model (the unbatched path) and then through BatchingEncoder. Runs fully
+offline using the same encoders as load_test.py. Example:
+
+    python bench_encoder.py --sessions 50 --queries 20
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from batch_encoder import BatchingEncoder, MAX_BATCH_SIZE, MAX_WAIT_MS
+from index_store import EMBED_DIM, EMBED_MODEL
+from load_test import load_encoder, percentiles, queries_for
+
+
+# --- Benchmark Loop ---
+def run_mode(encoder, queries, args):
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.sessions)
+
+    def session(session_id):
+        rng = random.Random(args.seed + session_id)
+        barrier.wait()
+        for _ in range(args.queries):
+            start = time.perf_counter()
+            encoder.encode(rng.choice(queries), convert_to_tensor=True)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=session, args=(i,), daemon=True) for i in range(args.sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - start
+
+
+def report(label, latencies, elapsed):
+    print(f"- {label:<10} {len(latencies) / elapsed:8.1f} queries/sec | {percentiles(latencies)}")
+
+
+# --- CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched vs unbatched query encoding.")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent callers")
+    parser.add_argument("--queries", type=int, default=20, help="Queries per caller")
+    parser.add_argument("--encoder", choices=["model", "hash"], default="model",
+                        help=f"`model` loads the locally cached {EMBED_MODEL}; `hash` needs no model files")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--batch-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = load_encoder(args.encoder, EMBED_DIM)
+    queries = queries_for("bluebook") + queries_for("redbook")
+
+    # Warm up so the first timed call does not pay for lazy initialisation
+    model.encode(queries, convert_to_tensor=True)
+
+    print(f"⏱️ Encoding {args.sessions} sessions × {args.queries} queries...")
+    unbatched = run_mode(model, queries, args)
+
+    batcher = BatchingEncoder(model, max_batch_size=args.batch_size, max_wait_ms=args.batch_wait_ms)
+    try:
+        batched = run_mode(batcher, queries, args)
+    finally:
+        batcher.close()
+
+    print("\n📊 Query Encoding")
+    report("Unbatched", *unbatched)
+    report("Batched", *batched)
+
+
+if __name__ == "__main__":
+    main()
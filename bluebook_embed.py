@@ -8,9 +8,9 @@ Preprocessing script to extract and embed paragraphs from the Bluebook PDF.
 
 import os
 import fitz  # PyMuPDF
-import pickle
 import re
 from sentence_transformers import SentenceTransformer
+from index_store import write_index
 
 # --- Configuration ---
 BLUEBOOK_PATH = "./private_docs/bluebook.pdf"
@@ -68,10 +68,10 @@ def save_embeddings(paragraphs, embeddings, output_path):
             "page": para["page"]
         })
 
-    with open(output_path, "wb") as f:
-        pickle.dump(data, f)
+    # Writes the .pkl plus a manifest recording the model, dimension, and content hash
+    manifest = write_index(data, output_path, EMBED_MODEL)
 
-    print("✅ Done. Embeddings saved.")
+    print(f"✅ Done. Embeddings saved (dim {manifest['dimension']}, {manifest['content_hash'][:19]}...).")
 
 # bluebook_embed.py — Part 3 of 3
 
@@ -1,4 +1,10 @@
 import streamlit as st
+import requests
+import torch
+from sentence_transformers import util
+
+# --- OpenRouter Endpoint ---
+OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 
 # --- Keyword Suggestion Dictionary ---
 COMMON_TOPICS = {
@@ -76,3 +82,68 @@ def render_keyword_suggestions(source_tag):
                 return query_text
 
     return None
+
+
+# --- Semantic Search over Embedded Paragraphs ---
+def search_embeddings(query, embeddings_data, model, k=3):
+    query_vec = model.encode(query, convert_to_tensor=True)
+    results = []
+
+    for item in embeddings_data:
+        sim = util.pytorch_cos_sim(query_vec, torch.tensor(item["embedding"]))[0][0]
+        results.append((sim.item(), item))
+
+    top_hits = sorted(results, key=lambda x: x[0], reverse=True)[:k]
+
+    return [{
+        "score": round(score, 4),
+        "text": item["text"],
+        "section": item["section"],
+        "page": item["page"]
+    } for score, item in top_hits]
+
+# --- Prompt Template ---
+def format_contextual_prompt(query, style_context, matches, source_tag):
+    book_label = "The Bluebook (21st ed.)" if source_tag == "bluebook" else "The Redbook (5th ed.)"
+
+    context_block = "\n\n".join([
+        f"Section: {m['section']} (Page {m['page']})\n{m['text']}" for m in matches
+    ])
+
+    return f"""You are a legal writing and citation assistant for professionals using {book_label}.
+
+The user is working in a **{style_context}** context and has asked the following question:
+
+"{query}"
+
+Your answer should:
+- Reference specific rule numbers or sections (e.g., Rule 10.2.1 or Redbook § 3.5)
+- Format citations based on whether the context is Bluepages, Whitepages, or Redbook grammar rules
+- Include page numbers where applicable
+- Clearly state which source the information comes from
+- Remind users that all AI output must be verified against the official text
+
+### Relevant Source Material:
+{context_block}
+
+### Your Answer:
+"""
+
+# --- Chat Completion Request ---
+def request_completion(prompt, model_name, api_key, api_url=OPENROUTER_API_URL, stream=False, timeout=None):
+    # Returns the raw response so callers decide how to handle errors and streaming
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "HTTP-Referer": "https://yourdomain.com",  # optional
+        "X-Title": "CiteWise"
+    }
+
+    payload = {
+        "model": model_name,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.4
+    }
+    if stream:
+        payload["stream"] = True
+
+    return requests.post(api_url, headers=headers, json=payload, stream=stream, timeout=timeout)
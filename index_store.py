@@ -0,0 +1,257 @@
+# index_store.py
+"""
+Versioned, hot-reloadable store for the Bluebook and Redbook embedding indexes.
+
+Each `*_embeddings.pkl` ships with a `*_embeddings.manifest.json` next to it:
+
+    {"model": "all-MiniLM-L6-v2", "dimension": 384, "count": 1234,
+     "built_at": "2025-05-05T12:00:00+00:00", "content_hash": "sha256:..."}
+
+Indexes are only served if the manifest matches the query model and the file
+contents. IndexStore polls `private_docs/` in the background and atomically swaps
+in a new index once it validates, so re-embedded books go live without a restart
+and queries already running keep the index they started with.
+
+Backfill a manifest for an index built before manifests existed:
+
+    python index_store.py private_docs/bluebook_embeddings.pkl
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from datetime import datetime, timezone
+
+# --- Configuration ---
+EMBED_MODEL = "all-MiniLM-L6-v2"
+EMBED_DIM = 384
+POLL_INTERVAL_S = 10.0
+
+EMBEDDING_PATHS = {
+    "bluebook": os.path.join("private_docs", "bluebook_embeddings.pkl"),
+    "redbook": os.path.join("private_docs", "redbook_embeddings.pkl")
+}
+REQUIRED_KEYS = ("text", "embedding", "section", "page")
+
+
+class IndexValidationError(Exception):
+    """Raised when an index file does not match its manifest or the query model."""
+
+
+# --- Manifest Helpers ---
+def manifest_path(index_path):
+    root, _ = os.path.splitext(index_path)
+    return f"{root}.manifest.json"
+
+
+def content_hash(raw_bytes):
+    return "sha256:" + hashlib.sha256(raw_bytes).hexdigest()
+
+
+def build_manifest(data, raw_bytes, model_name, built_at=None):
+    built_at = built_at or datetime.now(timezone.utc)
+    return {
+        "model": model_name,
+        "dimension": len(data[0]["embedding"]) if data else 0,
+        "count": len(data),
+        "built_at": built_at.isoformat(timespec="seconds"),
+        "content_hash": content_hash(raw_bytes)
+    }
+
+
+def read_manifest(index_path):
+    path = manifest_path(index_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _atomic_write(path, raw_bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(raw_bytes)
+    os.replace(tmp_path, path)
+
+
+def write_index(data, output_path, model_name):
+    """Save an index and its manifest. The manifest goes last so readers never see it ahead of its data."""
+    raw_bytes = pickle.dumps(data)
+    manifest = build_manifest(data, raw_bytes, model_name)
+
+    _atomic_write(output_path, raw_bytes)
+    _atomic_write(manifest_path(output_path), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+# --- Loading & Validation ---
+def load_index(index_path, model_name=EMBED_MODEL, dimension=EMBED_DIM):
+    """Load an index, returning (data, manifest). `manifest` is None for legacy files without one."""
+    manifest = read_manifest(index_path)
+    with open(index_path, "rb") as f:
+        raw_bytes = f.read()
+
+    if manifest is not None:
+        if manifest.get("model") != model_name:
+            raise IndexValidationError(
+                f"{index_path} was embedded with {manifest.get('model')!r} but queries use {model_name!r}"
+            )
+        if manifest.get("dimension") != dimension:
+            raise IndexValidationError(
+                f"{index_path} has dimension {manifest.get('dimension')} but {model_name} produces {dimension}"
+            )
+        if manifest.get("content_hash") != content_hash(raw_bytes):
+            raise IndexValidationError(f"{index_path} does not match the content hash in its manifest (it may still be being written)")
+
+    data = pickle.loads(raw_bytes)
+
+    if not isinstance(data, list) or not data:
+        raise IndexValidationError(f"{index_path} is not a non-empty list of paragraphs")
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or any(key not in item for key in REQUIRED_KEYS):
+            raise IndexValidationError(
+                f"{index_path} paragraph {i} is missing one of the keys {', '.join(REQUIRED_KEYS)}"
+            )
+        # Every vector is checked, including in legacy files, so a mixed-length file fails here and not mid-query
+        if len(item["embedding"]) != dimension:
+            raise IndexValidationError(
+                f"{index_path} paragraph {i} has a {len(item['embedding'])}-dim vector "
+                f"but {model_name} produces {dimension}"
+            )
+
+    return data, manifest
+
+
+# --- Hot-Reloading Store ---
+class IndexStore:
+    def __init__(self, paths=EMBEDDING_PATHS, model_name=EMBED_MODEL, dimension=EMBED_DIM,
+                 poll_interval=POLL_INTERVAL_S):
+        self.paths = dict(paths)
+        self.model_name = model_name
+        self.dimension = dimension
+        self.poll_interval = poll_interval
+
+        # Swapped wholesale on reload; readers grab a reference and never see a partial update
+        self._indexes = {}
+        self._manifests = {}
+        self._errors = {}
+        self._signatures = {}
+
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.reload()
+
+    # --- Reads (safe from any session thread) ---
+    def snapshot(self):
+        """Current indexes as a dict of tag → paragraphs. Hold on to it for the length of a query."""
+        return self._indexes
+
+    def get(self, tag):
+        return self._indexes.get(tag)
+
+    def manifests(self):
+        return self._manifests
+
+    def errors(self):
+        """Problems from the last load of each source (missing file, failed validation, no manifest)."""
+        return self._errors
+
+    # --- Reloading ---
+    def _signature(self, path):
+        sig = []
+        for p in (path, manifest_path(path)):
+            try:
+                stat = os.stat(p)
+                sig.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def reload(self):
+        """Reload any index whose files changed on disk. Returns the tags that were swapped in."""
+        with self._reload_lock:
+            indexes = dict(self._indexes)
+            manifests = dict(self._manifests)
+            errors = dict(self._errors)
+            swapped = []
+
+            for tag, path in self.paths.items():
+                signature = self._signature(path)
+                if signature == self._signatures.get(tag):
+                    continue
+                self._signatures[tag] = signature
+
+                if signature[0] is None:
+                    errors[tag] = f"Missing embedding file: {path}"
+                    continue
+
+                try:
+                    data, manifest = load_index(path, self.model_name, self.dimension)
+                except Exception as e:
+                    # Any bad or truncated file disables only this source; keep serving the previous version, if any
+                    errors[tag] = f"Rejected {path}: {e}"
+                    print(f"❌ {errors[tag]}")
+                    continue
+
+                indexes[tag] = data
+                manifests[tag] = manifest
+                if manifest is None:
+                    errors[tag] = f"{path} has no manifest, so its embedding model cannot be verified"
+                else:
+                    errors.pop(tag, None)
+                swapped.append(tag)
+
+            if swapped:
+                self._indexes = indexes
+                self._manifests = manifests
+                for tag in swapped:
+                    built_at = (manifests[tag] or {}).get("built_at", "unknown build time")
+                    print(f"🔄 Loaded {tag} index ({len(indexes[tag])} paragraphs, built {built_at})")
+            self._errors = errors
+            return swapped
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"⚠️ Index reload failed: {e}")
+
+    def start_watching(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="index-store-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# --- CLI: Backfill Manifests ---
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a manifest for an existing embeddings .pkl file.")
+    parser.add_argument("paths", nargs="+", help="Index files to write manifests for")
+    parser.add_argument("--model", default=EMBED_MODEL, help="Embedding model the file was built with")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        with open(path, "rb") as f:
+            raw_bytes = f.read()
+        # The file's modification time is the best record of when it was built
+        built_at = datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+        manifest = build_manifest(pickle.loads(raw_bytes), raw_bytes, args.model, built_at)
+        _atomic_write(manifest_path(path), json.dumps(manifest, indent=2).encode("utf-8"))
+        print(f"✅ Wrote {manifest_path(path)} ({manifest['count']} paragraphs, dim {manifest['dimension']})")
+
+
+if __name__ == "__main__":
+    main()
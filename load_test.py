@@ -0,0 +1,337 @@
+# load_test.py
+"""
+Load driver that simulates many concurrent CiteWise sessions hitting the query path.
+
+Each worker process mirrors one Streamlit server process: the embeddings and the
+query encoder are loaded once and shared by every session thread, the same way
+`st.cache_resource` shares them in the app. Each session then runs the real query
+path from helpers.py (search → prompt → chat completion) against a local
+OpenRouter stand-in.
+
+✅ Reports:
+- Throughput (queries/sec)
+- p50 / p95 / p99 latency for search, LLM call, time to first token, and end to end
+- Response status breakdown (200, 429, 5xx, client errors)
+- Peak resident memory per worker process
+
+Runs fully offline. Example:
+
+    python load_test.py --mock --sessions 50 --mock-args "--latency-ms 600 --rate-limit-rate 0.05"
+"""
+
+import os
+
+# Never reach out to the Hugging Face Hub during a load test
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import argparse
+import hashlib
+import multiprocessing
+import queue
+import random
+import re
+import shlex
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+
+from helpers import COMMON_TOPICS, choose_model, search_embeddings, format_contextual_prompt, request_completion
+import mock_openrouter
+from batch_encoder import BatchingEncoder, MAX_BATCH_SIZE, MAX_WAIT_MS
+from index_store import EMBEDDING_PATHS, EMBED_MODEL, load_index
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+# --- Configuration ---
+STYLE_CONTEXTS = ["Whitepages", "Bluepages", "Redbook"]
+
+
+# --- Offline Query Encoders ---
+class HashingEncoder:
+    """Deterministic bag-of-words encoder for runs where the real model is not cached locally."""
+
+    def __init__(self, dim):
+        self.dim = dim
+
+    def _encode_one(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            h = int(hashlib.md5(token.encode("utf-8")).hexdigest()[:8], 16)
+            vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vec
+
+    def encode(self, sentences, convert_to_tensor=False, **kwargs):
+        single = isinstance(sentences, str)
+        batch = np.stack([self._encode_one(s) for s in ([sentences] if single else sentences)])
+        out = batch[0] if single else batch
+        return torch.from_numpy(out) if convert_to_tensor else out
+
+
+def load_encoder(kind, dim):
+    if kind == "hash":
+        return HashingEncoder(dim)
+
+    from sentence_transformers import SentenceTransformer
+    try:
+        return SentenceTransformer(EMBED_MODEL)
+    except OSError as e:
+        raise SystemExit(
+            f"❌ {EMBED_MODEL} is not cached locally and the load test runs offline. "
+            f"Run the app once to download it, or pass --encoder hash. ({e})"
+        )
+
+
+def load_embeddings(source_tag):
+    path = EMBEDDING_PATHS[source_tag]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Missing embedding file: {path}")
+    data, _ = load_index(path)
+    return data
+
+
+def queries_for(source_tag):
+    topics = COMMON_TOPICS["Bluebook" if source_tag == "bluebook" else "Redbook"]
+    return [query for entries in topics.values() for _, query in entries]
+
+
+# --- Memory Helpers ---
+def peak_rss_mb():
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- One Simulated Session ---
+def run_query(query, embeddings_data, encoder, api_url, source_tag, args):
+    record = {"status": None, "search_s": None, "llm_s": None, "ttft_s": None, "total_s": None}
+    start = time.perf_counter()
+
+    matches = search_embeddings(query, embeddings_data, encoder, k=args.k)
+    after_search = time.perf_counter()
+    record["search_s"] = after_search - start
+
+    prompt = format_contextual_prompt(query, random.choice(STYLE_CONTEXTS), matches, source_tag)
+
+    try:
+        response = request_completion(prompt, choose_model(source_tag), "mock-key", api_url=api_url,
+                                      stream=args.stream, timeout=args.timeout)
+        record["status"] = str(response.status_code)
+        if response.status_code == 200:
+            if args.stream:
+                for line in response.iter_lines():
+                    if record["ttft_s"] is None and line.startswith(b"data: "):
+                        record["ttft_s"] = time.perf_counter() - after_search
+                    if line == b"data: [DONE]":
+                        break
+            else:
+                response.json()["choices"][0]["message"]["content"]
+        response.close()
+    except Exception as e:
+        record["status"] = type(e).__name__
+
+    end = time.perf_counter()
+    record["llm_s"] = end - after_search
+    record["total_s"] = end - start
+    return record
+
+
+def run_session(session_id, embeddings_data, encoder, api_url, source_tag, args, records, lock):
+    rng = random.Random(args.seed + session_id)
+    queries = queries_for(source_tag)
+
+    # Spread session starts over the ramp-up window
+    if args.ramp_up:
+        time.sleep(rng.uniform(0, args.ramp_up))
+
+    for _ in range(args.queries):
+        record = run_query(rng.choice(queries), embeddings_data, encoder, api_url, source_tag, args)
+        with lock:
+            records.append(record)
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+# --- One Worker Process ---
+def run_worker(worker_id, sessions, api_url, args, start_barrier):
+    random.seed(args.seed + worker_id)
+
+    # Loaded once per process and shared by every session, like st.cache_resource
+    embeddings_data = load_embeddings(args.source)
+    encoder = load_encoder(args.encoder, len(embeddings_data[0]["embedding"]))
+    if args.batch_encoder:
+        encoder = BatchingEncoder(encoder, max_batch_size=args.batch_size, max_wait_ms=args.batch_wait_ms)
+    loaded_rss = peak_rss_mb()
+
+    records = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=run_session,
+            args=(worker_id * 10_000 + i, embeddings_data, encoder, api_url, args.source, args, records, lock),
+            daemon=True
+        )
+        for i in range(sessions)
+    ]
+
+    # Wait until every worker has loaded so the load windows overlap
+    start_barrier.wait()
+    started_at = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    finished_at = time.time()
+
+    if args.batch_encoder:
+        encoder.close()
+
+    return {
+        "worker_id": worker_id,
+        "sessions": sessions,
+        "records": records,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "loaded_rss_mb": loaded_rss,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def _worker_main(worker_id, sessions, api_url, args, start_barrier, result_queue):
+    try:
+        result_queue.put(run_worker(worker_id, sessions, api_url, args, start_barrier))
+    except BaseException as e:
+        # Release the other workers instead of leaving them blocked on the barrier
+        start_barrier.abort()
+        result_queue.put({"worker_id": worker_id, "error": f"{type(e).__name__}: {e}"})
+
+
+# --- Reporting ---
+def percentiles(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return "n/a"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50 * 1000:8.1f} ms | p95 {p95 * 1000:8.1f} ms | p99 {p99 * 1000:8.1f} ms"
+
+
+def print_report(results, wall_s):
+    records = [r for res in results for r in res["records"]]
+    # Measure throughput over the load window only, not process start-up and model loading
+    run_s = max(res["finished_at"] for res in results) - min(res["started_at"] for res in results)
+    ok = [r for r in records if r["status"] == "200"]
+
+    statuses = {}
+    for r in records:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+
+    print("\n📊 Load Test Results")
+    print(f"- Queries:     {len(records)} in {run_s:.2f}s ({wall_s:.2f}s including start-up)")
+    print(f"- Throughput:  {len(records) / run_s:.2f} queries/sec ({len(ok) / run_s:.2f} successful/sec)")
+    print("- Statuses:    " + ", ".join(f"{k}: {v}" for k, v in sorted(statuses.items())))
+    print(f"- Search:      {percentiles([r['search_s'] for r in records])}")
+    print(f"- LLM call:    {percentiles([r['llm_s'] for r in ok])}")
+    print(f"- First token: {percentiles([r['ttft_s'] for r in ok])}")
+    print(f"- End to end:  {percentiles([r['total_s'] for r in ok])}")
+
+    print("\n🧠 Memory per Worker")
+    for res in sorted(results, key=lambda r: r["worker_id"]):
+        print(f"- Worker {res['worker_id']}: {res['sessions']} sessions, "
+              f"{res['loaded_rss_mb']:.1f} MB after load, {res['peak_rss_mb']:.1f} MB peak")
+
+
+# --- CLI ---
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Simulate concurrent CiteWise sessions against a mock OpenRouter.")
+    parser.add_argument("--url", default=f"http://{mock_openrouter.DEFAULT_HOST}:{mock_openrouter.DEFAULT_PORT}"
+                                          f"{mock_openrouter.COMPLETIONS_PATH}",
+                        help="Chat-completions endpoint to hit (ignored with --mock)")
+    parser.add_argument("--mock", action="store_true", help="Start mock_openrouter.py in-process on a free port")
+    parser.add_argument("--mock-args", default="", help='Options for the mock, e.g. "--latency-ms 500 --error-rate 0.02"')
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (one per Streamlit server)")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions across all workers")
+    parser.add_argument("--queries", type=int, default=5, help="Queries per session")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between a session's queries (s)")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="Window over which sessions start (s)")
+    parser.add_argument("--source", choices=list(EMBEDDING_PATHS), default="bluebook")
+    parser.add_argument("--encoder", choices=["model", "hash"], default="model",
+                        help=f"`model` loads the locally cached {EMBED_MODEL}; `hash` needs no model files")
+    parser.add_argument("--batch-encoder", action="store_true",
+                        help="Encode queries through the shared micro-batching encoder")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE, help="Max queries per batched forward pass")
+    parser.add_argument("--batch-wait-ms", type=float, default=MAX_WAIT_MS, help="Max time to wait for a batch to fill")
+    parser.add_argument("--stream", action="store_true", help="Request streamed completions and time the first token")
+    parser.add_argument("--k", type=int, default=3, help="Matches retrieved per query")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main():
+    args = build_arg_parser().parse_args()
+
+    server = None
+    api_url = args.url
+    if args.mock:
+        mock_config = mock_openrouter.build_arg_parser().parse_args(shlex.split(args.mock_args) + ["--port", "0"])
+        server = mock_openrouter.start_in_background(mock_config)
+        api_url = server.url
+        print(f"🧪 Started mock OpenRouter at {api_url}")
+
+    workers = max(1, min(args.workers, args.sessions))
+    per_worker = [args.sessions // workers + (1 if i < args.sessions % workers else 0) for i in range(workers)]
+    print(f"🚀 Running {args.sessions} sessions × {args.queries} queries across {workers} worker(s)...")
+
+    # Spawn keeps torch state out of the children and matches a fresh server process
+    # One process per worker so each peak RSS reading belongs to exactly one worker
+    ctx = multiprocessing.get_context("spawn")
+    start_barrier = ctx.Barrier(workers)
+    result_queue = ctx.Queue()
+    start = time.perf_counter()
+    processes = [
+        ctx.Process(target=_worker_main, args=(i, n, api_url, args, start_barrier, result_queue))
+        for i, n in enumerate(per_worker)
+    ]
+    for p in processes:
+        p.start()
+    # Drain results before joining so large record lists cannot block a child on exit
+    results = []
+    while len(results) < len(processes):
+        try:
+            results.append(result_queue.get(timeout=1.0))
+        except queue.Empty:
+            # A worker was killed (e.g. out of memory) without reporting back
+            if any(p.exitcode not in (None, 0) for p in processes):
+                start_barrier.abort()
+            if not any(p.is_alive() for p in processes):
+                reported = {res["worker_id"] for res in results}
+                results += [{"worker_id": i, "error": f"exited with code {p.exitcode}"}
+                            for i, p in enumerate(processes) if i not in reported]
+    for p in processes:
+        p.join()
+    wall_s = time.perf_counter() - start
+
+    failed = [res for res in results if "error" in res]
+    if failed:
+        for res in failed:
+            print(f"❌ Worker {res['worker_id']} failed: {res['error']}")
+        raise SystemExit(1)
+
+    print_report(results, wall_s)
+
+    if server is not None:
+        print(f"🧪 Mock server counts: {server.snapshot()}")
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# mock_openrouter.py
+"""
+Offline stand-in for the OpenRouter chat-completions endpoint.
+
+Used for local load testing so `ask_llama` can be exercised without an API key
+or network access. Point the app (or load_test.py) at it with:
+
+    OPENROUTER_API_URL=http://127.0.0.1:8000/api/v1/chat/completions
+
+✅ Simulates:
+- Configurable response latency (fixed, uniform, normal, lognormal, exponential)
+- Random 5xx errors and 429 rate limits (plus a concurrency cap that returns 429)
+- Streaming responses (`"stream": true`) as server-sent events
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Default Configuration ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+COMPLETIONS_PATH = "/api/v1/chat/completions"
+
+MOCK_ANSWER = (
+    "Under Rule 10.9 of The Bluebook, a case may be cited in short form once it has been "
+    "cited in full in the same general discussion. Use the first party's name, the volume, "
+    "the reporter, and the pincite. Please verify this guidance against the official text."
+)
+
+
+# --- Latency Sampling ---
+def sample_latency(config):
+    """Return a simulated latency in seconds drawn from the configured distribution."""
+    mean = config.latency_ms / 1000.0
+    spread = config.jitter_ms / 1000.0
+    dist = config.latency_dist
+
+    if dist == "fixed":
+        value = mean
+    elif dist == "uniform":
+        value = random.uniform(mean - spread, mean + spread)
+    elif dist == "normal":
+        value = random.gauss(mean, spread)
+    elif dist == "lognormal":
+        # Heavy right tail, closest to what hosted LLM endpoints look like.
+        # Fit mu/sigma so the samples keep the requested mean and spread.
+        if mean > 0:
+            sigma2 = math.log(1 + (spread / mean) ** 2)
+            value = random.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+        else:
+            value = 0.0
+    elif dist == "exponential":
+        value = random.expovariate(1.0 / mean) if mean > 0 else 0.0
+    else:
+        raise ValueError(f"Unknown latency distribution: {dist}")
+
+    return max(0.0, value)
+
+
+# --- Request Handler ---
+class MockOpenRouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockOpenRouter/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.config.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, extra_headers=None):
+        self._send_json(status, {"error": {"code": status, "message": message}}, extra_headers)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send_json(200, {"status": "ok", "stats": self.server.snapshot()})
+        else:
+            self._send_error(404, f"No route for {self.path}")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw_body = self.rfile.read(length) if length else b""
+
+        if self.path.rstrip("/") != COMPLETIONS_PATH:
+            self._send_error(404, f"No route for {self.path}")
+            return
+
+        try:
+            payload = json.loads(raw_body or b"{}")
+        except json.JSONDecodeError:
+            self._send_error(400, "Request body is not valid JSON")
+            return
+
+        if not payload.get("messages"):
+            self._send_error(400, "`messages` is required")
+            return
+
+        config = self.server.config
+
+        if not self.server.acquire_slot():
+            self.server.record("429")
+            self._send_error(429, "Rate limit exceeded: too many concurrent requests",
+                             {"Retry-After": str(config.retry_after)})
+            return
+
+        try:
+            roll = random.random()
+            if roll < config.rate_limit_rate:
+                self.server.record("429")
+                self._send_error(429, "Rate limit exceeded", {"Retry-After": str(config.retry_after)})
+                return
+            if roll < config.rate_limit_rate + config.error_rate:
+                time.sleep(sample_latency(config))
+                self.server.record("5xx")
+                self._send_error(random.choice([500, 502, 503]), "Upstream provider error")
+                return
+
+            model = payload.get("model", "mock/model")
+            if payload.get("stream"):
+                self._stream_completion(model)
+            else:
+                time.sleep(sample_latency(config))
+                self._send_json(200, self._build_completion(model))
+            self.server.record("200")
+        finally:
+            self.server.release_slot()
+
+    # --- Response Builders ---
+    def _build_completion(self, model):
+        return {
+            "id": f"gen-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": MOCK_ANSWER},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(MOCK_ANSWER.split()), "total_tokens": 0}
+        }
+
+    def _stream_completion(self, model):
+        config = self.server.config
+        completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+        words = MOCK_ANSWER.split(" ")
+
+        # Time to first token follows the latency distribution; the rest trickles out per chunk
+        time.sleep(sample_latency(config))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else f" {word}"},
+                    "finish_reason": None
+                }]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if config.chunk_delay_ms:
+                time.sleep(config.chunk_delay_ms / 1000.0)
+
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+# --- Server ---
+class MockOpenRouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config):
+        super().__init__((config.host, config.port), MockOpenRouterHandler)
+        self.config = config
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {"200": 0, "429": 0, "5xx": 0}
+
+    def acquire_slot(self):
+        with self._lock:
+            if self.config.max_concurrent and self._in_flight >= self.config.max_concurrent:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release_slot(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def record(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._stats, in_flight=self._in_flight)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{COMPLETIONS_PATH}"
+
+
+def start_in_background(config):
+    """Start the mock server on a daemon thread and return it (used by load_test.py)."""
+    server = MockOpenRouterServer(config)
+    thread = threading.Thread(target=server.serve_forever, name="mock-openrouter", daemon=True)
+    thread.start()
+    return server
+
+
+# --- CLI ---
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Offline mock of the OpenRouter chat-completions API.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Use 0 to pick a free port")
+    parser.add_argument("--latency-dist", default="lognormal",
+                        choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=400.0, help="Spread around the mean latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that return 5xx")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests that return 429")
+    parser.add_argument("--max-concurrent", type=int, default=0,
+                        help="Return 429 once this many requests are in flight (0 = unlimited)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--chunk-delay-ms", type=float, default=20.0, help="Delay between streamed chunks")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    return parser
+
+
+def main():
+    config = build_arg_parser().parse_args()
+    server = MockOpenRouterServer(config)
+    print(f"🧪 Mock OpenRouter listening on {server.url}")
+    print(f"⏱️ Latency: {config.latency_dist} (mean {config.latency_ms} ms, spread {config.jitter_ms} ms)")
+    print(f"⚠️ Errors: {config.error_rate:.0%} 5xx, {config.rate_limit_rate:.0%} 429")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down mock server.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
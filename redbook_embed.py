@@ -11,7 +11,6 @@ Generates structured data including:
 import os
 import fitz  # PyMuPDF
 import re
-import pickle
 
 # --- File Paths ---
 REDBOOK_PDF_PATH = "./private_docs/redbook.pdf"
@@ -50,6 +49,7 @@ def extract_redbook_paragraphs(pdf_path):
 from sentence_transformers import SentenceTransformer
 import torch
 from tqdm import tqdm
+from index_store import write_index
 
 # --- Model Setup ---
 EMBED_MODEL = "all-MiniLM-L6-v2"
@@ -79,10 +79,10 @@ def save_embeddings(paragraphs, embeddings, output_path):
             "page": para["page"]
         })
 
-    with open(output_path, "wb") as f:
-        pickle.dump(output_data, f)
+    # Writes the .pkl plus a manifest recording the model, dimension, and content hash
+    write_index(output_data, output_path, EMBED_MODEL)
 
-    print("✅ Saved embeddings with section and page metadata.")
+    print("✅ Saved embeddings with section, page, and model manifest metadata.")
 
 # redbook_embed.py — Part 4 of 4
 
@@ -1,14 +1,16 @@
 # streamlit_app.py — Part 1 of 7
 import streamlit as st
-import pickle
-import torch
 import os
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 import numpy as np
 from datetime import datetime
 import re
 from helpers import render_keyword_suggestions
 from helpers import choose_model
+from helpers import search_embeddings, format_contextual_prompt, request_completion
+from helpers import OPENROUTER_API_URL as DEFAULT_OPENROUTER_API_URL
+from batch_encoder import BatchingEncoder
+from index_store import IndexStore, EMBED_MODEL
 
 # --- Page Configuration ---
 st.set_page_config(page_title="CiteWise", layout="wide")
@@ -85,26 +87,18 @@ context_label = {
 st.markdown(f"✍️ Using: **{context_label}** formatting rules")
 
 # --- Step 2: Load Embeddings for Bluebook & Redbook ---
+# One store per server; it validates each index's manifest and hot-swaps new versions
+# dropped into private_docs/ without a restart.
 @st.cache_resource(show_spinner="Loading legal sources...")
-def load_all_embeddings():
-    sources = {}
+def load_index_store():
+    return IndexStore().start_watching()
 
-    EMBEDDING_PATHS = {
-        "bluebook": os.path.join("private_docs", "bluebook_embeddings.pkl"),
-        "redbook": os.path.join("private_docs", "redbook_embeddings.pkl")
-    }
+index_store = load_index_store()
+for tag, problem in index_store.errors().items():
+    st.warning(f"⚠️ {problem}")
 
-    for tag, path in EMBEDDING_PATHS.items():
-        if os.path.exists(path):
-            with open(path, "rb") as f:
-                sources[tag] = pickle.load(f)
-        else:
-            st.warning(f"⚠️ Missing embedding file: {path}")
-    return sources
-
-
-# All loaded data (dict: "bluebook" → [...], "redbook" → [...])
-embedding_sources = load_all_embeddings()
+# All loaded data (dict: "bluebook" → [...], "redbook" → [...]), pinned for this run
+embedding_sources = index_store.snapshot()
 
 # Select based on user's radio choice (from Part A)
 selected_data = embedding_sources.get(source_tag)
@@ -116,9 +110,14 @@ if not selected_data:
 # --- 3. Load Sentence Embedding Model ---
 @st.cache_resource
 def load_model():
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    return SentenceTransformer(EMBED_MODEL)
+
+# Shared across sessions so concurrent queries are encoded in one batched forward pass
+@st.cache_resource
+def load_query_encoder():
+    return BatchingEncoder(load_model())
 
-embed_model = load_model()
+query_encoder = load_query_encoder()
 
 # --- 4. User Query + Auto-Suggest ---
 st.subheader("Step 3: Ask a Citation or Writing Question")
@@ -219,21 +218,7 @@ st.info("These highlights are based on real writing errors flagged by editors, c
 
 # --- 5. Embed Query and Search ---
 def search_source_embeddings(query, embeddings_data, k=3):
-    query_vec = embed_model.encode(query, convert_to_tensor=True)
-    results = []
-
-    for item in embeddings_data:
-        sim = util.pytorch_cos_sim(query_vec, torch.tensor(item["embedding"]))[0][0]
-        results.append((sim.item(), item))
-
-    top_hits = sorted(results, key=lambda x: x[0], reverse=True)[:k]
-    
-    return [{
-        "score": round(score, 4),
-        "text": item["text"],
-        "section": item["section"],
-        "page": item["page"]
-    } for score, item in top_hits]
+    return search_embeddings(query, embeddings_data, query_encoder, k=k)
 
 # --- 6. Run Search ---
 top_matches = search_source_embeddings(query, selected_data, k=3)
@@ -245,39 +230,19 @@ for match in top_matches:
 
 
 # --- 7. Prompt Building ---
-import requests
-
 OPENROUTER_API_KEY = st.secrets.get("OPENROUTER_API_KEY")  # Loaded securely from Streamlit Cloud
 if not OPENROUTER_API_KEY:
     st.error("❌ OpenRouter API key not found. Did you set it in Streamlit secrets?")
 
+# Override to point at a local stand-in (e.g. mock_openrouter.py) for load testing
+OPENROUTER_API_URL = st.secrets.get(
+    "OPENROUTER_API_URL", os.environ.get("OPENROUTER_API_URL", DEFAULT_OPENROUTER_API_URL)
+)
+
 
 @st.cache_data
 def build_contextual_prompt(query, style_context, matches, source_tag):
-    book_label = "The Bluebook (21st ed.)" if source_tag == "bluebook" else "The Redbook (5th ed.)"
-
-    context_block = "\n\n".join([
-        f"Section: {m['section']} (Page {m['page']})\n{m['text']}" for m in matches
-    ])
-
-    return f"""You are a legal writing and citation assistant for professionals using {book_label}.
-
-The user is working in a **{style_context}** context and has asked the following question:
-
-"{query}"
-
-Your answer should:
-- Reference specific rule numbers or sections (e.g., Rule 10.2.1 or Redbook § 3.5)
-- Format citations based on whether the context is Bluepages, Whitepages, or Redbook grammar rules
-- Include page numbers where applicable
-- Clearly state which source the information comes from
-- Remind users that all AI output must be verified against the official text
-
-### Relevant Source Material:
-{context_block}
-
-### Your Answer:
-"""
+    return format_contextual_prompt(query, style_context, matches, source_tag)
 
 
 # --- 8. Ask the OpenRouter LLM (with fallback model)
@@ -287,21 +252,7 @@ def ask_llama(prompt, source_tag):
     except Exception:
         model_name = "r1-free"  # fallback
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "HTTP-Referer": "https://yourdomain.com",  # optional
-        "X-Title": "CiteWise"
-    }
-
-    response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers=headers,
-        json={
-            "model": model_name,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.4
-        }
-    )
+    response = request_completion(prompt, model_name, OPENROUTER_API_KEY, api_url=OPENROUTER_API_URL)
 
     if response.status_code != 200:
         st.error(f"❌ API Error {response.status_code}: {response.text}")